@@ -54,6 +54,14 @@ class JidtEstimator(Estimator):
         settings.setdefault('debug', False)
         self.settings = settings.copy()
 
+    def _as_double_array(self, var):
+        """Return realisations as a C-contiguous float64 array.
+
+        JPype copies C-contiguous float64 arrays into JAVA double arrays in a
+        single block, while other arrays are converted element-wise.
+        """
+        return np.ascontiguousarray(var, dtype=np.float64)
+
     def _start_jvm(self):
         """Start JAVA virtual machine if it is not running."""
         jar_location = resource_filename(__name__, 'infodynamics.jar')
@@ -109,7 +117,7 @@ class JidtKraskov(JidtEstimator):
 
     Args:
         CalcClass : JAVA class
-            JAVA class returned by jpype.JPackage
+            JAVA class returned by jpype.JClass
         settings : dict [optional]
             set estimator parameters:
 
@@ -309,7 +317,7 @@ class JidtGaussian(JidtEstimator):
 
     Args:
         CalcClass : JAVA class
-            JAVA class returned by jpype.JPackage
+            JAVA class returned by jpype.JClass
         settings : dict [optional]
             set estimator parameters:
 
@@ -418,14 +426,15 @@ class JidtKraskovCMI(JidtKraskov):
         assert (settings['algorithm_num'] == 1) or (settings['algorithm_num'] == 2), (
             'Algorithm number must be 1 or 2')
         if (settings['algorithm_num'] == 1):
-            CalcClass = (
-                jp.JPackage('infodynamics.measures.continuous.kraskov').
-                ConditionalMutualInfoCalculatorMultiVariateKraskov1)
+            CalcClass = jp.JClass(
+                'infodynamics.measures.continuous.kraskov.'
+                'ConditionalMutualInfoCalculatorMultiVariateKraskov1')
         else:
-            CalcClass = (
-                jp.JPackage('infodynamics.measures.continuous.kraskov').
-                ConditionalMutualInfoCalculatorMultiVariateKraskov2)
+            CalcClass = jp.JClass(
+                'infodynamics.measures.continuous.kraskov.'
+                'ConditionalMutualInfoCalculatorMultiVariateKraskov2')
         super().__init__(CalcClass, settings)
+        self.est_mi = None
 
     def estimate(self, var1, var2, conditional=None):
         """Estimate conditional mutual information.
@@ -448,8 +457,9 @@ class JidtKraskovCMI(JidtKraskov):
         """
         # Return MI if no conditional was provided.
         if conditional is None:
-            est_mi = JidtKraskovMI(self.settings)
-            return est_mi.estimate(var1, var2)
+            if (self.est_mi is None):
+                self.est_mi = JidtKraskovMI(self.settings)
+            return self.est_mi.estimate(var1, var2)
         else:
             assert(conditional.size != 0), 'Conditional Array is empty.'
 
@@ -468,6 +478,9 @@ class JidtKraskovCMI(JidtKraskov):
         # Check if number of points is sufficient for estimation.
         self._check_number_of_points(var1.shape[0])
 
+        var1 = self._as_double_array(var1)
+        var2 = self._as_double_array(var2)
+        cond = self._as_double_array(cond)
         self.calc.initialise(var1.shape[1], var2.shape[1], cond.shape[1])
         self.calc.setObservations2D(var1, var2, cond)
         if self.settings['local_values']:
@@ -529,8 +542,8 @@ class JidtDiscreteCMI(JidtDiscrete):
         # Start JAVA virtual machine and create JAVA object. Add JAVA object to
         # instance
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.discrete').
-                     ConditionalMutualInformationCalculatorDiscrete)
+        CalcClass = jp.JClass('infodynamics.measures.discrete.'
+                              'ConditionalMutualInformationCalculatorDiscrete')
         self.calc = CalcClass()
         self.calc.setDebug(self.settings['debug'])
 
@@ -711,8 +724,8 @@ class JidtDiscreteMI(JidtDiscrete):
         # Start JAVA virtual machine and create JAVA object. Add JAVA object to
         # instance.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.discrete').
-                     MutualInformationCalculatorDiscrete)
+        CalcClass = jp.JClass('infodynamics.measures.discrete.'
+                              'MutualInformationCalculatorDiscrete')
         self.calc = CalcClass()
         self.calc.setDebug(self.settings['debug'])
 
@@ -863,11 +876,11 @@ class JidtKraskovMI(JidtKraskov):
         assert (settings['algorithm_num'] == 1) or (settings['algorithm_num'] == 2), (
             'Algorithm number must be 1 or 2')
         if (settings['algorithm_num'] == 1):
-            CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
-                         MutualInfoCalculatorMultiVariateKraskov1)
+            CalcClass = jp.JClass('infodynamics.measures.continuous.kraskov.'
+                                  'MutualInfoCalculatorMultiVariateKraskov1')
         else:
-            CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
-                         MutualInfoCalculatorMultiVariateKraskov2)
+            CalcClass = jp.JClass('infodynamics.measures.continuous.kraskov.'
+                                  'MutualInfoCalculatorMultiVariateKraskov2')
         super().__init__(CalcClass, settings)
 
         # Get lag and shift second variable to account for a lag if requested
@@ -901,6 +914,8 @@ class JidtKraskovMI(JidtKraskov):
         # Check if number of points is sufficient for estimation.
         self._check_number_of_points(var1.shape[0])
 
+        var1 = self._as_double_array(var1)
+        var2 = self._as_double_array(var2)
         self.calc.initialise(var1.shape[1], var2.shape[1])
         self.calc.setObservations2D(var1, var2)
 
@@ -970,8 +985,8 @@ class JidtKraskovAIS(JidtKraskov):
 
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
-                     ActiveInfoStorageCalculatorKraskov)
+        CalcClass = jp.JClass('infodynamics.measures.continuous.kraskov.'
+                              'ActiveInfoStorageCalculatorKraskov')
         super().__init__(CalcClass, settings)
 
     def estimate(self, process):
@@ -993,6 +1008,7 @@ class JidtKraskovAIS(JidtKraskov):
         # Check if number of points is sufficient for estimation.
         self._check_number_of_points(process.shape[0])
 
+        process = self._as_double_array(process)
         self.calc.initialise(self.settings['history'], self.settings['tau'])
         self.calc.setObservations(process)
         if self.settings['local_values']:
@@ -1052,8 +1068,8 @@ class JidtDiscreteAIS(JidtDiscrete):
 
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.discrete').
-                     ActiveInformationCalculatorDiscrete)
+        CalcClass = jp.JClass('infodynamics.measures.discrete.'
+                              'ActiveInformationCalculatorDiscrete')
         self.calc = CalcClass()
         self.calc.setDebug(self.settings['debug'])
 
@@ -1202,8 +1218,8 @@ class JidtGaussianAIS(JidtGaussian):
 
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
-                     ActiveInfoStorageCalculatorGaussian)
+        CalcClass = jp.JClass('infodynamics.measures.continuous.gaussian.'
+                              'ActiveInfoStorageCalculatorGaussian')
         super().__init__(CalcClass, settings)
 
     def estimate(self, process):
@@ -1222,6 +1238,7 @@ class JidtGaussianAIS(JidtGaussian):
         """
         process = self._ensure_one_dim_input(process)
 
+        process = self._as_double_array(process)
         self.calc.initialise(self.settings['history'], self.settings['tau'])
         self.calc.setObservations(process)
         if self.settings['local_values']:
@@ -1261,8 +1278,8 @@ class JidtGaussianMI(JidtGaussian):
         settings = self._check_settings(settings)
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
-                     MutualInfoCalculatorMultiVariateGaussian)
+        CalcClass = jp.JClass('infodynamics.measures.continuous.gaussian.'
+                              'MutualInfoCalculatorMultiVariateGaussian')
         super().__init__(CalcClass, settings)
 
         # Add lag between input variables. Setting the lag in JIDT didn't work,
@@ -1294,6 +1311,8 @@ class JidtGaussianMI(JidtGaussian):
             var1 = var1[:-self.settings['lag_mi'], :]
             var2 = var2[self.settings['lag_mi']:, :]
 
+        var1 = self._as_double_array(var1)
+        var2 = self._as_double_array(var2)
         self.calc.initialise(var1.shape[1], var2.shape[1])
         self.calc.setObservations2D(var1, var2)
         if self.settings['local_values']:
@@ -1337,8 +1356,9 @@ class JidtGaussianCMI(JidtGaussian):
         settings = self._check_settings(settings)
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
-                     ConditionalMutualInfoCalculatorMultiVariateGaussian)
+        CalcClass = jp.JClass(
+            'infodynamics.measures.continuous.gaussian.'
+            'ConditionalMutualInfoCalculatorMultiVariateGaussian')
         super().__init__(CalcClass, settings)
         self.est_mi = None
 
@@ -1380,6 +1400,9 @@ class JidtGaussianCMI(JidtGaussian):
             'Unequal number of observations (var1: {0}, cond: {1}).'.format(
                 var1.shape[0], cond.shape[0]))
 
+        var1 = self._as_double_array(var1)
+        var2 = self._as_double_array(var2)
+        cond = self._as_double_array(cond)
         self.calc.initialise(var1.shape[1], var2.shape[1], cond.shape[1])
         self.calc.setObservations2D(var1, var2, cond)
         if self.settings['local_values']:
@@ -1467,8 +1490,8 @@ class JidtKraskovTE(JidtKraskov):
         settings = self._check_settings(settings)
         # Start JAVA virtual machine.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
-                     TransferEntropyCalculatorKraskov)
+        CalcClass = jp.JClass('infodynamics.measures.continuous.kraskov.'
+                              'TransferEntropyCalculatorKraskov')
         # Get embedding and delay parameters.
         settings = self._set_te_defaults(settings)
         super().__init__(CalcClass, settings)
@@ -1496,6 +1519,8 @@ class JidtKraskovTE(JidtKraskov):
         self._check_number_of_points(source.shape[0] -
                                      self.settings['source_target_delay'])
 
+        source = self._as_double_array(source)
+        target = self._as_double_array(target)
         self.calc.initialise(self.settings['history_target'],
                              self.settings['tau_target'],
                              self.settings['history_source'],
@@ -1580,8 +1605,8 @@ class JidtDiscreteTE(JidtDiscrete):
 
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.discrete').
-                     TransferEntropyCalculatorDiscrete)
+        CalcClass = jp.JClass('infodynamics.measures.discrete.'
+                              'TransferEntropyCalculatorDiscrete')
         self.calc = CalcClass()
         self.calc.setDebug(self.settings['debug'])
 
@@ -1729,8 +1754,8 @@ class JidtGaussianTE(JidtGaussian):
         settings = self._check_settings(settings)
         # Start JAVA virtual machine and create JAVA object.
         self._start_jvm()
-        CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
-                     TransferEntropyCalculatorGaussian)
+        CalcClass = jp.JClass('infodynamics.measures.continuous.gaussian.'
+                              'TransferEntropyCalculatorGaussian')
         # Get embedding and delay parameters.
         settings = self._set_te_defaults(settings)
         super().__init__(CalcClass, settings)
@@ -1754,6 +1779,8 @@ class JidtGaussianTE(JidtGaussian):
         source = self._ensure_one_dim_input(source)
         target = self._ensure_one_dim_input(target)
 
+        source = self._as_double_array(source)
+        target = self._as_double_array(target)
         self.calc.initialise(self.settings['history_target'],
                              self.settings['tau_target'],
                              self.settings['history_source'],
@@ -1,6 +1,9 @@
-import sys
 import logging
-from pkg_resources import resource_filename
+try:
+    from importlib.resources import files as resource_files
+except ImportError:  # Python < 3.9
+    from pkg_resources import resource_string
+    resource_files = None
 from scipy.special import digamma
 import numpy as np
 from idtxl.estimator import Estimator
@@ -15,6 +18,23 @@ except ImportError as err:
 logger = logging.getLogger(__name__)
 C = 1024**2
 
+# OpenCL contexts and programs are shared by all estimator instances, such
+# that kernels are compiled once per process and not for every instance.
+# Contexts are cached per platform, programs per context and build options.
+_CONTEXT_CACHE = {}
+_PROGRAM_CACHE = {}
+
+
+def _read_kernel_source(filename):
+    """Return OpenCL kernel source distributed with the package.
+
+    The source is read as a package resource, which also works if the
+    package is installed as a zip archive.
+    """
+    if resource_files is not None:
+        return resource_files(__package__).joinpath(filename).read_text()
+    return resource_string(__name__, filename).decode()
+
 
 class OpenCLKraskov(Estimator):
     """Abstract class for implementation of OpenCL estimators.
@@ -42,6 +62,11 @@ class OpenCLKraskov(Estimator):
     dimension and pass the number of chunks to the estimators. Chunks must be
     of equal size.
 
+    Neighbour searches are implemented as brute-force searches, i.e., each
+    point is compared to all other points in its chunk, such that run time
+    grows quadratically with the chunk length. For long, low-dimensional
+    signals a tree-based search may be faster, see PythonKraskovCMI.
+
     Set common estimation parameters for OpenCL estimators. For usage of these
     estimators see documentation for the child classes.
 
@@ -49,8 +74,11 @@ class OpenCLKraskov(Estimator):
         settings : dict [optional]
             set estimator parameters:
 
-            - gpuid : int [optional] - device ID used for estimation (if more
-              than one device is available on the current platform) (default=0)
+            - gpuid : int | list of int [optional] - device ID used for
+              estimation (if more than one device is available on the current
+              platform), if a list of IDs is provided, the CMI estimator
+              distributes chunks over all listed devices, the MI estimator
+              uses the first listed device only (default=0)
             - kraskov_k : int [optional] - no. nearest neighbours for KNN
               search (default=4)
             - normalise : bool [optional] - z-standardise data (default=False)
@@ -58,8 +86,19 @@ class OpenCLKraskov(Estimator):
               in KNN and range searches (default=0)
             - noise_level : float [optional] - random noise added to the data
               (default=1e-8)
-            - padding : bool [optional] - pad data to a length that is a
-              multiple of 1024, workaround for a
+            - rng_seed : int | None [optional] - random seed if noise level > 0
+              (default=None)
+            - storage_dtype : str [optional] - data type used to store point
+              sets on the device, 'float32', 'float16', or 'bfloat16';
+              16-bit types halve the memory traffic of neighbour searches,
+              but rounding introduces ties between distances, which biases
+              estimates upwards, e.g., by about 0.005 nats for 'float16' and
+              0.02 nats for 'bfloat16' for chunks of 300 Gaussian samples;
+              for 'float16' data should be normalised, 'bfloat16' keeps the
+              range of float32 at a lower precision (default='float32')
+            - padding : bool [optional] - deprecated and ignored, point sets
+              used to be padded to a multiple of 4096 points to align device
+              sub-buffers, which are no longer used (default=True)
             - debug : bool [optional] - calculate intermediate results, i.e.
               neighbour counts from range searches and KNN distances, print
               debug output to console (default=False)
@@ -81,19 +120,56 @@ class OpenCLKraskov(Estimator):
         self.settings.setdefault('debug', False)
         self.settings.setdefault('return_counts', False)
         self.settings.setdefault('verbose', True)
+        self.settings.setdefault('rng_seed', None)
+        self.settings.setdefault('storage_dtype', 'float32')
         self.sizeof_float = int(np.dtype(np.float32).itemsize)
         self.sizeof_int = int(np.dtype(np.int32).itemsize)
 
         if self.settings['return_counts'] and not self.settings['debug']:
             raise RuntimeError(
                 'Set debug option to True to return neighbor counts.')
+        if self.settings['storage_dtype'] not in [
+                'float32', 'float16', 'bfloat16']:
+            raise RuntimeError(
+                'Unknown storage data type {0}, use float32, float16, or '
+                'bfloat16.'.format(self.settings['storage_dtype']))
+        if self.settings['storage_dtype'] == 'float32':
+            self.sizeof_point = self.sizeof_float
+        else:
+            self.sizeof_point = 2
+
+        # Init rng for added gaussian noise
+        self._rng = np.random.default_rng(self.settings['rng_seed'])
 
         # Get kernel and devices.
-        self.devices, self.context, self.queue = self._get_device(
-                                                        self.settings['gpuid'])
-        self.kernel_location = resource_filename(__name__,
-                                                 'gpuKnnKernelNoIdx.cl')
-        self.kNN_kernel, self.RS_kernel = self._get_kernels()
+        # If a list of device IDs is provided, create one command queue per
+        # device, all devices share the context and kernels.
+        gpuids = self.settings['gpuid']
+        if not isinstance(gpuids, (list, tuple)):
+            gpuids = [gpuids]
+        self.devices, self.context, self.queue = self._get_device(gpuids[0])
+        self.queues = [self.queue]
+        for gpuid in gpuids[1:]:
+            if gpuid > len(self.devices)-1:
+                raise RuntimeError(
+                    'No device with gpuid {0} (available device IDs: '
+                    '{1}).'.format(gpuid, np.arange(len(self.devices))))
+            self.queues.append(
+                cl.CommandQueue(self.context, self.devices[gpuid]))
+        self.gpuids = gpuids
+        self.max_work_group_size = min(
+            self.devices[gpuid].max_work_group_size for gpuid in gpuids)
+        # Devices that share memory with the host, e.g., integrated GPUs, can
+        # read point sets directly from host memory.
+        self.unified_memory = all(
+            self.devices[gpuid].host_unified_memory for gpuid in gpuids)
+        # Device buffers are cached between runs, see _get_buffer().
+        self._buffers = {}
+        # Digamma lookup table of the last chunk length and device buffers
+        # holding the table per slot, see _enqueue_digamma_sums().
+        self._digamma_lut = None
+        self._digamma_buffers = {}
+        self.kNN_RS_kernel, self.digamma_kernel = self._get_kernels()
 
     def is_parallel(self):
         return True
@@ -109,8 +185,10 @@ class OpenCLKraskov(Estimator):
                         None)
         if platform is None:
             raise RuntimeError('No OpenCL GPU device found.')
-        my_gpu_devices = platform.get_devices(device_type=cl.device_type.GPU)
-        context = cl.Context(devices=my_gpu_devices)
+        if platform not in _CONTEXT_CACHE:
+            devices = platform.get_devices(device_type=cl.device_type.GPU)
+            _CONTEXT_CACHE[platform] = (devices, cl.Context(devices=devices))
+        my_gpu_devices, context = _CONTEXT_CACHE[platform]
         if gpuid > len(my_gpu_devices)-1:
             raise RuntimeError(
                 'No device with gpuid {0} (available device IDs: {1}).'.format(
@@ -120,29 +198,351 @@ class OpenCLKraskov(Estimator):
         return my_gpu_devices, context, queue
 
     def _get_kernels(self):
-        """Return KNN and range search OpenCL kernels."""
-        kernel_source = open(self.kernel_location).read()
-        program = cl.Program(self.context, kernel_source).build()
-        kNN_kernel = program.kernelKNNshared
-        kNN_kernel.set_scalar_arg_dtypes([None, None, None, np.int32,
-                                          np.int32, np.int32, np.int32,
-                                          np.int32, np.int32, None])  # MW: added one int32 argument
-
-        RS_kernel = program.kernelBFRSAllshared
-        RS_kernel.set_scalar_arg_dtypes([None, None, None, None,
-                                         np.int32, np.int32, np.int32,
-                                         np.int32, np.int32, None])  # MW: added one int32 argument
-        return (kNN_kernel, RS_kernel)
+        """Return fused KNN/range search and digamma reduction kernels."""
+        # Compile the number of nearest neighbours into the kernels, such that
+        # the compiler can unroll loops over neighbours.
+        options = ['-DKTH={}'.format(self.settings['kraskov_k'])]
+        if self.settings['storage_dtype'] == 'float16':
+            options.append('-DHALF_STORAGE')
+        elif self.settings['storage_dtype'] == 'bfloat16':
+            options.append('-DBF16_STORAGE')
+        key = (self.context, tuple(options))
+        if key not in _PROGRAM_CACHE:
+            kernel_source = _read_kernel_source('gpuKnnKernelNoIdx.cl')
+            _PROGRAM_CACHE[key] = cl.Program(
+                self.context, kernel_source).build(options=options)
+        program = _PROGRAM_CACHE[key]
+        # Kernel objects hold their arguments, create them per instance.
+        kNN_RS_kernel = cl.Kernel(program, 'kernelKNNRSMultishared')
+        kNN_RS_kernel.set_scalar_arg_dtypes([None, None, None, None, None,
+                                             np.int32, np.int32, np.int32,
+                                             np.int32, np.int32, np.int32,
+                                             np.int32, np.int32, np.int32,
+                                             None])
+
+        # Digammas are summed on the device in double precision, which is
+        # optional in OpenCL. Without it, counts are read back to the host.
+        if all('cl_khr_fp64' in self.devices[gpuid].extensions.split()
+               for gpuid in self.gpuids):
+            digamma_kernel = cl.Kernel(program, 'kernelDigammaReduce')
+            digamma_kernel.set_scalar_arg_dtypes([None, None, None, np.int32,
+                                                  np.int32, np.int32, None])
+        else:
+            digamma_kernel = None
+        return kNN_RS_kernel, digamma_kernel
+
+    def _build_pointset(self, *variables):
+        """Assemble variables into a single point set with noise.
+
+        Variables are stacked in the order passed, with one row per dimension,
+        into a single float32 array, such that data is cast and transposed in
+        one pass. Noise is added in place if noise_level > 0 and the point set
+        is converted to the storage data type.
+
+        Args:
+            variables : numpy arrays
+                realisations of variables, 2D numpy arrays with dimensions
+                [realisations x variable dimension]
+
+        Returns:
+            numpy array
+                point set with dimensions [point dimension x signal length]
+        """
+        signallength = variables[0].shape[0]
+        pointdim = sum(var.shape[1] for var in variables)
+        pointset = np.empty((pointdim, signallength), dtype=np.float32)
+        row = 0
+        for var in variables:
+            pointset[row:row+var.shape[1], :signallength] = var.T
+            row += var.shape[1]
+        if self.settings['noise_level'] > 0:
+            noise = self._rng.standard_normal(
+                size=(pointdim, signallength), dtype=np.float32)
+            noise *= self.settings['noise_level']
+            pointset += noise
+        return self._convert_pointset(pointset)
+
+    def _convert_pointset(self, pointset):
+        """Convert point set to the data type used for storage on device."""
+        if self.settings['storage_dtype'] == 'float32':
+            return pointset
+        if self.settings['storage_dtype'] == 'bfloat16':
+            # Keep the upper 16 bits of each float32, rounding to nearest
+            # even. bfloat16 has the range of float32.
+            bits = pointset.view(np.uint32)
+            bits = bits + (0x7FFF + ((bits >> 16) & 1))
+            return (bits >> 16).astype(np.uint16)
+        if np.abs(pointset).max() > np.finfo(np.float16).max:
+            raise RuntimeError('Data exceeds range of float16 storage data '
+                               'type, normalise data or use float32.')
+        return pointset.astype(np.float16)
+
+    def _get_buffer(self, name, size, slot=0):
+        """Return cached device buffer of at least the requested size.
+
+        Device buffers are kept between runs, such that they are not allocated
+        and released for every run. Runs that are in flight at the same time
+        use different slots. A cached buffer is reallocated if a larger buffer
+        is requested.
+
+        Args:
+            name : str
+                name of the buffer
+            size : int
+                requested buffer size in bytes
+            slot : int [optional]
+                slot of the run using the buffer (default=0)
+
+        Returns:
+            pyopencl.Buffer
+                device buffer
+        """
+        buffer = self._buffers.get((name, slot))
+        if buffer is None or buffer.size < size:
+            if buffer is not None:
+                buffer.release()
+            buffer = cl.Buffer(self.context, cl.mem_flags.READ_WRITE, size)
+            self._buffers[(name, slot)] = buffer
+        return buffer
+
+    def _release_buffers(self, first_slot=0, buffer_sizes=None,
+                         max_slot_size=None):
+        """Release cached device buffers.
+
+        Cached buffers only grow, release them before they exceed the device
+        memory available to the current call. A slot is released if the sum
+        over its buffers of the larger of the cached and the requested size
+        exceeds max_slot_size, i.e., if it would exceed max_slot_size once its
+        buffers have grown to the sizes requested by the current call.
+
+        Args:
+            first_slot : int [optional]
+                release buffers of all slots from first_slot on (default=0)
+            buffer_sizes : dict [optional]
+                buffer sizes in bytes requested by the current call per slot,
+                indexed by buffer name, see _get_buffer_sizes() (default=None)
+            max_slot_size : int [optional]
+                also release buffers of slots that would hold more than
+                max_slot_size bytes in total (default=None)
+        """
+        if buffer_sizes is None:
+            buffer_sizes = {}
+        slot_sizes = {}
+        for (name, slot), buffer in self._buffers.items():
+            slot_sizes[slot] = slot_sizes.get(slot, 0) + max(
+                buffer.size, buffer_sizes.get(name, 0))
+        for slot in slot_sizes:
+            # Add buffers requested by the current call but not yet cached.
+            slot_sizes[slot] += sum(
+                size for name, size in buffer_sizes.items()
+                if (name, slot) not in self._buffers)
+        release = [slot for slot, size in slot_sizes.items()
+                   if slot >= first_slot or
+                   (max_slot_size is not None and size > max_slot_size)]
+        for key in [key for key in self._buffers if key[1] in release]:
+            self._buffers.pop(key).release()
+
+    def _get_buffer_sizes(self, pointdim, n_subspaces, chunklength,
+                          n_chunks):
+        """Return sizes of device buffers used by a single run.
+
+        Args:
+            pointdim : int
+                point dimension
+            n_subspaces : int
+                no. subspaces with neighbour counts, equals the no. blocks
+            chunklength : int
+                no. points per chunk
+            n_chunks : int
+                max. no. chunks per run
+
+        Returns:
+            dict
+                buffer sizes in bytes, indexed by buffer name
+        """
+        signallength = chunklength * n_chunks
+        buffer_sizes = {
+            'pointset': self.sizeof_point * pointdim * signallength,
+            'blocks': self.sizeof_int * (n_subspaces + 1),
+            'subspaces': self.sizeof_int * 2 * n_subspaces,
+            'distances': (self.sizeof_float * self._n_stored_dist() *
+                          signallength),
+            'counts': self.sizeof_int * n_subspaces * signallength}
+        if self._sum_digammas_on_device():
+            float64_size = np.dtype(np.float64).itemsize
+            buffer_sizes['digamma'] = float64_size * (chunklength + 1)
+            buffer_sizes['sums'] = float64_size * n_subspaces * n_chunks
+        return buffer_sizes
+
+    def _get_pointset_buffer(self, queue, pointset, slot=0):
+        """Return device buffer holding the point set.
+
+        On devices that share memory with the host, the buffer uses the memory
+        of the host array, such that no copy is made. The host array must not
+        be modified or freed until all kernels using the buffer have finished.
+        On all other devices, the point set is uploaded without blocking into
+        a cached buffer.
+
+        Returns:
+            pyopencl.Buffer
+                device buffer
+            list of pyopencl.Event
+                events of pending uploads, kernels reading the buffer from a
+                queue other than the one passed must wait for these
+        """
+        if self.unified_memory:
+            # The buffer is bound to the host array and can not be reused,
+            # replace the buffer of the previous run in this slot.
+            d_pointset = self._buffers.pop(('pointset', slot), None)
+            if d_pointset is not None:
+                d_pointset.release()
+            d_pointset = cl.Buffer(
+                self.context,
+                cl.mem_flags.READ_ONLY | cl.mem_flags.USE_HOST_PTR,
+                hostbuf=pointset)
+            self._buffers[('pointset', slot)] = d_pointset
+            return d_pointset, []
+        d_pointset = self._get_buffer('pointset', pointset.nbytes, slot)
+        upload = cl.enqueue_copy(queue, d_pointset, pointset,
+                                 is_blocking=False)
+        return d_pointset, [upload]
+
+    def _n_stored_dist(self):
+        """Return no. neighbour distances stored per point on the device."""
+        if self.settings['debug']:
+            return self.settings['kraskov_k']
+        else:
+            return 1
+
+    def _concatenate_runs(self, all_results):
+        """Concatenate results of all GPU runs of a single estimate() call.
+
+        Results are concatenated once after all runs have finished, instead of
+        growing result arrays in every run. Arrays are returned as float64.
+
+        Args:
+            all_results : list
+                results returned for each run, i.e., a numpy array of
+                estimates or a tuple of numpy arrays if debug is True
+
+        Returns:
+            numpy array | tuple of numpy arrays
+                concatenated results
+        """
+        if self.settings['debug']:
+            return tuple(np.concatenate(r).astype(np.float64, copy=False)
+                         for r in zip(*all_results))
+        else:
+            return np.concatenate(all_results).astype(np.float64, copy=False)
+
+    def _get_launch_params(self, chunklength, signallength):
+        """Return global and local work size for the kernel launch.
+
+        Args:
+            chunklength : int
+                no. points per chunk
+            signallength : int
+                total no. points
+
+        Returns:
+            int, int
+                global work size (NDRange_x) and work group size (workitems_x)
+        """
+        if chunklength < self.max_work_group_size:
+            workitems_x = 8
+        elif self.max_work_group_size < 256:
+            workitems_x = self.max_work_group_size
+        else:
+            workitems_x = 256
+        NDRange_x = -(-signallength // workitems_x) * workitems_x
+        return NDRange_x, workitems_x
+
+    def _sum_digammas_on_device(self):
+        """Return True if digammas of neighbour counts are summed on device.
+
+        Per-chunk sums are sufficient to estimate average (C)MI. Neighbour
+        counts are needed on the host for local values and in debug mode, and
+        if the devices do not support double precision.
+        """
+        return not (self.settings['local_values'] or self.settings['debug'] or
+                    self.digamma_kernel is None)
+
+    def _enqueue_digamma_sums(self, queue, d_npointsrange, n_subspaces,
+                              n_chunks, chunklength, signallength, slot=0):
+        """Enqueue summation of digamma(count + 1) per chunk and subspace.
+
+        Instead of reading back neighbour counts for all points, digammas are
+        looked up and summed over each chunk on the device in double
+        precision, such that only n_chunks * n_subspaces sums are read back to
+        the host.
+
+        Args:
+            queue : pyopencl.CommandQueue
+                queue used to launch the kernel, must be the queue used for
+                the neighbour searches
+            d_npointsrange : pyopencl.Buffer
+                neighbour counts written by the neighbour search kernel
+            n_subspaces : int
+                no. subspaces with neighbour counts
+            n_chunks : int
+                no. chunks in the current run
+            chunklength : int
+                no. points per chunk
+            signallength : int
+                total no. points in the current run
+            slot : int [optional]
+                buffer slot of the current run, see _get_buffer()
+
+        Returns:
+            numpy array, list of pyopencl.Event
+                sums with shape (n_chunks, n_subspaces), which are valid once
+                all returned events have finished
+        """
+        # Counts are bounded by the chunk length, look up digamma(count + 1)
+        # in a table, which is kept while the chunk length does not change.
+        # The table is uploaded once per slot, unless the slot's buffer has
+        # been reallocated since.
+        if (self._digamma_lut is None or
+                self._digamma_lut.size != chunklength + 1):
+            self._digamma_lut = digamma(np.arange(1, chunklength + 2))
+            self._digamma_buffers = {}
+        digamma_lut = self._digamma_lut
+        d_digamma = self._get_buffer('digamma', digamma_lut.nbytes, slot)
+        if self._digamma_buffers.get(slot) is not d_digamma:
+            cl.enqueue_copy(queue, d_digamma, digamma_lut, is_blocking=False)
+            self._digamma_buffers[slot] = d_digamma
+        sums = np.empty((n_chunks, n_subspaces), dtype=np.float64)
+        d_sums = self._get_buffer('sums', sums.nbytes, slot)
+
+        # One work group of a power-of-two size per chunk.
+        workitems_x = 1 << (min(256, self.max_work_group_size).bit_length() -
+                            1)
+        localmem = cl.LocalMemory(sums.itemsize * workitems_x)
+        self.digamma_kernel(queue, (n_chunks * workitems_x,), (workitems_x,),
+                            d_npointsrange, d_digamma, d_sums, n_subspaces,
+                            chunklength, signallength, localmem)
+        return sums, [cl.enqueue_copy(queue, sums, d_sums, is_blocking=False)]
+
+    def _get_mem_per_run(self, chunklength, n_subspaces):
+        """Return device memory per run that does not scale with no. chunks.
+
+        This is the digamma lookup table, see _enqueue_digamma_sums(), and the
+        block and subspace definitions passed to the neighbour search kernel,
+        where the no. blocks equals the no. subspaces.
+        """
+        return (np.dtype(np.float64).itemsize * (chunklength + 1) +
+                self.sizeof_int * (3 * n_subspaces + 1))
 
     def _get_max_mem(self):
         """Return max. GPU main memory available for computation."""
+        global_mem_size = min(
+            self.devices[gpuid].global_mem_size for gpuid in self.gpuids)
         if 'max_mem' in self.settings:
             return self.settings['max_mem']
         elif 'max_mem_frac' in self.settings:
-            return self.settings['max_mem_frac'] * self.devices[
-                                    self.settings['gpuid']].global_mem_size
+            return self.settings['max_mem_frac'] * global_mem_size
         else:
-            return 0.9 * self.devices[self.settings['gpuid']].global_mem_size
+            return 0.9 * global_mem_size
 
 
 class OpenCLKraskovMI(OpenCLKraskov):
@@ -157,8 +557,10 @@ class OpenCLKraskovMI(OpenCLKraskov):
         settings : dict [optional]
             set estimator parameters:
 
-            - gpuid : int [optional] - device ID used for estimation (if more
-              than one device is available on the current platform) (default=0)
+            - gpuid : int | list of int [optional] - device ID used for
+              estimation (if more than one device is available on the current
+              platform), if a list of IDs is provided, only the first listed
+              device is used (default=0)
             - kraskov_k : int [optional] - no. nearest neighbours for KNN
               search (default=4)
             - normalise : bool [optional] - z-standardise data (default=False)
@@ -166,6 +568,16 @@ class OpenCLKraskovMI(OpenCLKraskov):
               in KNN and range searches (default=0)
             - noise_level : float [optional] - random noise added to the data
               (default=1e-8)
+            - rng_seed : int | None [optional] - random seed if noise level > 0
+              (default=None)
+            - storage_dtype : str [optional] - data type used to store point
+              sets on the device, 'float32', 'float16', or 'bfloat16';
+              16-bit types halve the memory traffic of neighbour searches,
+              but rounding introduces ties between distances, which biases
+              estimates upwards, e.g., by about 0.005 nats for 'float16' and
+              0.02 nats for 'bfloat16' for chunks of 300 Gaussian samples;
+              for 'float16' data should be normalised, 'bfloat16' keeps the
+              range of float32 at a lower precision (default='float32')
             - debug : bool [optional] - return intermediate results, i.e.
               neighbour counts from range searches and KNN distances
               (default=False)
@@ -220,51 +632,51 @@ class OpenCLKraskovMI(OpenCLKraskov):
         var1dim = var1.shape[1]
         var2dim = var2.shape[1]
         pointdim = var1dim + var2dim
-        kraskov_k = self.settings['kraskov_k']
 
-        mem_data = self.sizeof_float * chunklength * pointdim
-        mem_dist = self.sizeof_float * chunklength * kraskov_k
+        mem_data = self.sizeof_point * chunklength * pointdim
+        mem_dist = self.sizeof_float * chunklength * self._n_stored_dist()
         mem_ncnt = 2 * self.sizeof_int * chunklength
-        mem_chunk = mem_data + mem_dist + mem_ncnt
+        mem_sums = 2 * np.dtype(np.float64).itemsize
+        mem_chunk = mem_data + mem_dist + mem_ncnt + mem_sums
+        mem_run = self._get_mem_per_run(chunklength, n_subspaces=2)
         max_mem = self._get_max_mem()
 
-        max_chunks_per_run = np.floor(max_mem/mem_chunk).astype(int)
+        max_chunks_per_run = int((max_mem - mem_run) // mem_chunk)
         chunks_per_run = min(max_chunks_per_run, n_chunks)
 
         logger.debug(
             'Memory per chunk: {0:.5f} MB, GPU global memory: {1} MB, chunks '
             'per run: {2}.'.format(
                 mem_chunk / C, max_mem / C, chunks_per_run))
-        if mem_chunk > max_mem:
+        if mem_chunk + mem_run > max_mem:
             raise RuntimeError('Size of single chunk exceeds GPU global '
                                'memory.')
 
-        mi_array = np.array([])
-        if self.settings['debug']:
-            distances = np.array([])
-            count_var1 = np.array([])
-            count_var2 = np.array([])
+        # Release cached device buffers that would exceed the memory budget
+        # once grown to the sizes needed by this call.
+        self._release_buffers(
+            first_slot=1,
+            buffer_sizes=self._get_buffer_sizes(
+                pointdim, 2, chunklength, chunks_per_run),
+            max_slot_size=max_mem)
 
+        all_results = []
         for r in range(0, n_chunks, chunks_per_run):
             startidx = r*chunklength
             stopidx = min(r+chunks_per_run, n_chunks)*chunklength
             subset1 = var1[startidx:stopidx, :]
             subset2 = var2[startidx:stopidx, :]
             n_chunks_current_run = subset1.shape[0] // chunklength
-            results = self._estimate_single_run(subset1, subset2,
-                                                n_chunks_current_run)
-            if self.settings['debug']:
-                mi_array = np.concatenate((mi_array,   results[0]))
-                distances = np.concatenate((distances,  results[1]))
-                count_var1 = np.concatenate((count_var1, results[2]))
-                count_var2 = np.concatenate((count_var2, results[3]))
-            else:
-                mi_array = np.concatenate((mi_array, results))
+            all_results.append(self._estimate_single_run(
+                subset1, subset2, n_chunks_current_run))
 
+        results = self._concatenate_runs(all_results)
         if self.settings['return_counts']:
-            return mi_array, distances, count_var1, count_var2
+            return results  # mi_array, distances, count_var1, count_var2
+        elif self.settings['debug']:
+            return results[0]
         else:
-            return mi_array
+            return results
 
     def _estimate_single_run(self, var1, var2, n_chunks=1):
         """Estimate mutual information in a single GPU run.
@@ -303,145 +715,98 @@ class OpenCLKraskovMI(OpenCLKraskov):
         var2dim = var2.shape[1]
         pointdim = var1dim + var2dim
 
-        # prepare for the padding
-        signallength_orig = signallength  # used for clarity at present
-
-        if self.settings['padding']:
-            # Pad time series to make GPU memory regions a multiple of 1024
-            # This value of 1024 should be replaced by
-            #  self.devices[self.settings['gpuid']].CL_DEVICE_MEM_BASE_ADDR_ALIGN
-            # or something similar, as professional cards are known to have
-            # base adress alignment of 4096 sometimes
-            pad_target = 4096
-            pad_size = (int(np.ceil(signallength/pad_target)) * pad_target -
-                        signallength)
-            pad_var1 = np.vstack(
-                [var1, 999999 + 0.1 * np.random.rand(pad_size, var1dim)])
-            pad_var2 = np.vstack(
-                [var2, 999999 + 0.1 * np.random.rand(pad_size, var2dim)])
-            pointset = np.hstack((pad_var1, pad_var2)).T.copy()
-            signallength_padded = signallength + pad_size
-        else:
-            pad_size = 0
-            pointset = np.hstack((var1, var2)).T.copy()
-            signallength_padded = signallength
-
-        if not pointset.dtype == np.float32:
-            pointset = pointset.astype(np.float32)
-        if self.settings['noise_level'] > 0:
-            pointset += np.random.normal(
-                scale=self.settings['noise_level'],
-                size=pointset.shape).astype(np.float32)
+        # Assemble the point set [var1, var2], with one row per dimension.
+        pointset = self._build_pointset(var1, var2)
 
         if self.settings['debug']:
-            # Print memory requirements after padding
-            mem_data_pad = (self.sizeof_float *
-                            pointset.shape[0] * pointset.shape[1])
-            mem_dist = (self.sizeof_float * signallength_padded *
+            # Print memory requirements
+            mem_data = (self.sizeof_point *
+                        pointset.shape[0] * pointset.shape[1])
+            mem_dist = (self.sizeof_float * signallength *
                         self.settings['kraskov_k'])
-            mem_ncnt = 2 * self.sizeof_int * signallength_padded
-            mem_total = mem_data_pad + mem_dist + mem_ncnt
+            mem_ncnt = 2 * self.sizeof_int * signallength
+            mem_total = mem_data + mem_dist + mem_ncnt
             logger.debug(
-                'Memory req. after padding: {0:.2f} MB ({1} elements, shape: '
-                '{2}, {3} chunks, chunksize: {4}) -- Padding: {5}'.format(
+                'Memory req.: {0:.2f} MB ({1} elements, shape: {2}, {3} '
+                'chunks, chunksize: {4})'.format(
                     mem_total / C, pointset.size, pointset.shape,
-                    n_chunks, chunklength, pad_size))
-            assert (pointset.shape[1] - pad_size) % n_chunks == 0
+                    n_chunks, chunklength))
 
         # Set OpenCL kernel launch parameters
-        if chunklength < self.devices[
-                                self.settings['gpuid']].max_work_group_size:
-            workitems_x = 8
-        elif self.devices[self.settings['gpuid']].max_work_group_size < 256:
-            workitems_x = self.devices[
-                                self.settings['gpuid']].max_work_group_size
-        else:
-            workitems_x = 256
-        NDRange_x = (workitems_x *
-                     (int((signallength_padded - 1)/workitems_x) + 1))
+        NDRange_x, workitems_x = self._get_launch_params(
+            chunklength, signallength)
         logger.debug('NDRange_x: {}, workitems_x: {}'.format(
             NDRange_x, workitems_x))
 
         # Allocate and copy memory to device
         kraskov_k = self.settings['kraskov_k']
-        d_pointset = cl.Buffer(
-                        self.context,
-                        cl.mem_flags.READ_ONLY | cl.mem_flags.COPY_HOST_PTR,
-                        hostbuf=pointset)
-        d_var1 = d_pointset.get_sub_region(
-                        0,
-                        self.sizeof_float * signallength_padded * var1dim,
-                        cl.mem_flags.READ_ONLY)
-        d_var2 = d_pointset.get_sub_region(
-                        self.sizeof_float * signallength_padded * var1dim,
-                        self.sizeof_float * signallength_padded * var2dim,
-                        cl.mem_flags.READ_ONLY)
-        d_distances = cl.Buffer(
-                        self.context, cl.mem_flags.READ_WRITE,
-                        self.sizeof_float * kraskov_k * signallength_padded)
-        d_vecradius = d_distances.get_sub_region(
-                    signallength_padded * (kraskov_k - 1) * self.sizeof_float,
-                    signallength_padded * self.sizeof_float)
-        d_npointsrange_x = cl.Buffer(self.context, cl.mem_flags.READ_WRITE,
-                                     self.sizeof_int * signallength_padded)
-        d_npointsrange_y = cl.Buffer(self.context, cl.mem_flags.READ_WRITE,
-                                     self.sizeof_int * signallength_padded)
-
-        # Neighbour search
+        d_pointset, _ = self._get_pointset_buffer(self.queue, pointset)
+        # Range searches are performed in the blocks of dimensions of var1 and
+        # var2, see OpenCLKraskovCMI._enqueue_single_run().
+        blocks = np.array([0, var1dim, pointdim], dtype=np.int32)
+        subspaces = np.array([[0, 1],
+                              [1, 1]], dtype=np.int32)
+        n_subspaces = subspaces.shape[0]
+        d_blocks = self._get_buffer('blocks', blocks.nbytes)
+        cl.enqueue_copy(self.queue, d_blocks, blocks, is_blocking=False)
+        d_subspaces = self._get_buffer('subspaces', subspaces.nbytes)
+        cl.enqueue_copy(self.queue, d_subspaces, subspaces, is_blocking=False)
+        # Outside debug mode, only the distance to the kth neighbour is
+        # stored on the device.
+        d_distances = self._get_buffer(
+                        'distances',
+                        self.sizeof_float * self._n_stored_dist() *
+                        signallength)
+        d_npointsrange = self._get_buffer(
+                        'counts',
+                        self.sizeof_int * n_subspaces * signallength)
+
+        # Neighbour search in full space and range searches in var1 and var2
+        # in a single kernel launch. Point sets are not padded, such that the
+        # row stride equals the signal length.
         theiler_t = np.int32(self.settings['theiler_t'])
         localmem = cl.LocalMemory(self.sizeof_float * kraskov_k * workitems_x)
-        self.kNN_kernel(self.queue, (NDRange_x,), (workitems_x,), d_pointset,
-                        d_pointset, d_distances, np.int32(pointdim),
-                        np.int32(chunklength), np.int32(signallength_padded),
-                        np.int32(signallength_orig),
-                        np.int32(kraskov_k), theiler_t, localmem)
-        distances = np.zeros(signallength_padded * kraskov_k, dtype=np.float32)
-        try:
-            cl.enqueue_copy(self.queue, distances, d_distances)
-        except cl._cl.RuntimeError as e:
-            print(e)
-            # Print memory requirements after padding
-            mem_data_pad = (self.sizeof_float *
+        self.kNN_RS_kernel(self.queue, (NDRange_x,), (workitems_x,),
+                           d_pointset, d_distances, d_npointsrange, d_blocks,
+                           d_subspaces, len(blocks) - 1, n_subspaces,
+                           pointdim, chunklength,
+                           signallength, signallength, kraskov_k,
+                           theiler_t, self.settings['debug'], localmem)
+        # Distances are only read back to the host in debug mode.
+        if self.settings['debug']:
+            distances = np.empty(signallength * kraskov_k,
+                                 dtype=np.float32)
+            try:
+                cl.enqueue_copy(self.queue, distances, d_distances)
+            except cl._cl.RuntimeError:
+                # Log memory requirements and pass the error on to the
+                # caller.
+                mem_data = (self.sizeof_point *
                             pointset.shape[0] * pointset.shape[1])
-            mem_dist = (self.sizeof_float * signallength_padded *
-                        self.settings['kraskov_k'])
-            mem_ncnt = 2 * self.sizeof_int * signallength_padded
-            mem_total = mem_data_pad + mem_dist + mem_ncnt
-            print(
-                'Memory req. after padding: {0:.2f} MB ({1} elements, shape: '
-                '{2}, {3} chunks, chunksize: {4}) -- Padding: {5}'.format(
-                    mem_total / C, pointset.size, pointset.shape,
-                    n_chunks, chunklength, pad_size))
-            assert (pointset.shape[1] - pad_size) % n_chunks == 0
-            sys.exit(1)
-        self.queue.finish()
-
-        # Range search in var1
-        localmem = cl.LocalMemory(self.sizeof_int * workitems_x)
-        self.RS_kernel(
-            self.queue, (NDRange_x,), (workitems_x,), d_var1,
-            d_var1, d_vecradius, d_npointsrange_x,
-            var1dim, chunklength, signallength_padded, signallength_orig,
-            theiler_t, localmem)  # MW: added signallength_orig
-        count_var1 = np.zeros(signallength_padded, dtype=np.int32)
-        cl.enqueue_copy(self.queue, count_var1, d_npointsrange_x)
-
-        # Range search in var2
-        self.RS_kernel(
-            self.queue, (NDRange_x,), (workitems_x,), d_var2,
-            d_var2, d_vecradius, d_npointsrange_y,
-            var2dim, chunklength, signallength_padded, signallength_orig,
-            theiler_t, localmem)  # MW: added signallength_orig
-        count_var2 = np.zeros(signallength_padded, dtype=np.int32)
-        cl.enqueue_copy(self.queue, count_var2, d_npointsrange_y)
-
-        d_pointset.release()
-        d_distances.release()
-        d_npointsrange_x.release()
-        d_npointsrange_y.release()
-        d_var1.release()
-        d_var2.release()
-        d_vecradius.release()
+                mem_dist = (self.sizeof_float * signallength *
+                            self.settings['kraskov_k'])
+                mem_ncnt = 2 * self.sizeof_int * signallength
+                mem_total = mem_data + mem_dist + mem_ncnt
+                logger.error(
+                    'Memory req.: {0:.2f} MB ({1} elements, shape: {2}, {3} '
+                    'chunks, chunksize: {4})'.format(
+                        mem_total / C, pointset.size, pointset.shape,
+                        n_chunks, chunklength))
+                raise
+        assert signallength == n_chunks*chunklength, 'Original signal length does not match no. processed points.'
+        if self._sum_digammas_on_device():
+            sums, events = self._enqueue_digamma_sums(
+                self.queue, d_npointsrange, n_subspaces, n_chunks,
+                chunklength, signallength)
+            cl.wait_for_events(events)
+            return (digamma(kraskov_k) + digamma(chunklength) -
+                    sums.sum(axis=1) / chunklength)
+
+        # Blocking copy of counts in var1 and var2, waits for all previous
+        # commands in the queue.
+        counts = np.empty((n_subspaces, signallength), dtype=np.int32)
+        cl.enqueue_copy(self.queue, counts, d_npointsrange)
+        count_var1, count_var2 = counts
 
         # Calculate and sum digammas
         if self.settings['local_values']:
@@ -462,13 +827,12 @@ class OpenCLKraskovMI(OpenCLKraskov):
                       digamma(count_var1[c*chunklength:(c+1)*chunklength]+1) +
                       digamma(count_var2[c*chunklength:(c+1)*chunklength]+1)))
                 mi_array[c] = mi
-        assert signallength_orig == (c+1)*chunklength, 'Original signal length does not match no. processed points.'
 
         if self.settings['debug']:
             return (mi_array,
-                    distances[:signallength_orig],
-                    count_var1[:signallength_orig],
-                    count_var2[:signallength_orig])
+                    distances[:signallength],
+                    count_var1,
+                    count_var2)
         else:
             return mi_array
 
@@ -487,8 +851,11 @@ class OpenCLKraskovCMI(OpenCLKraskov):
         settings : dict [optional]
             set estimator parameters:
 
-            - gpuid : int [optional] - device ID used for estimation (if more
-              than one device is available on the current platform) (default=0)
+            - gpuid : int | list of int [optional] - device ID used for
+              estimation (if more than one device is available on the current
+              platform), if a list of IDs is provided, chunks are distributed
+              over all listed devices; MI estimation (conditional is None)
+              uses the first listed device only (default=0)
             - kraskov_k : int [optional] - no. nearest neighbours for KNN
               search (default=4)
             - normalise : bool [optional] - z-standardise data (default=False)
@@ -496,6 +863,16 @@ class OpenCLKraskovCMI(OpenCLKraskov):
               in KNN and range searches (default=0)
             - noise_level : float [optional] - random noise added to the data
               (default=1e-8)
+            - rng_seed : int | None [optional] - random seed if noise level > 0
+              (default=None)
+            - storage_dtype : str [optional] - data type used to store point
+              sets on the device, 'float32', 'float16', or 'bfloat16';
+              16-bit types halve the memory traffic of neighbour searches,
+              but rounding introduces ties between distances, which biases
+              estimates upwards, e.g., by about 0.005 nats for 'float16' and
+              0.02 nats for 'bfloat16' for chunks of 300 Gaussian samples;
+              for 'float16' data should be normalised, 'bfloat16' keeps the
+              range of float32 at a lower precision (default='float32')
             - debug : bool [optional] - return intermediate results, i.e.
               neighbour counts from range searches and KNN distances
               (default=False)
@@ -506,6 +883,11 @@ class OpenCLKraskovCMI(OpenCLKraskov):
 
     def __init__(self, settings=None):
         super().__init__(settings)
+        self.est_mi = None
+        # Use a second queue per device for uploads, such that uploading data
+        # for the next run overlaps with computations of the current run.
+        self.copy_queues = [cl.CommandQueue(self.context, queue.device)
+                            for queue in self.queues]
 
     def estimate(self, var1, var2, conditional=None, n_chunks=1):
         """Estimate conditional mutual information.
@@ -537,8 +919,9 @@ class OpenCLKraskovCMI(OpenCLKraskov):
         """
         # Return MI if no conditional is provided
         if conditional is None:
-            est_mi = OpenCLKraskovMI(self.settings)
-            return est_mi.estimate(var1, var2, n_chunks)
+            if self.est_mi is None:
+                self.est_mi = OpenCLKraskovMI(self.settings)
+            return self.est_mi.estimate(var1, var2, n_chunks)
 
         # Prepare data: check if variable realisations are passed as 1D or 2D
         # arrays and have equal no. observations.
@@ -555,54 +938,72 @@ class OpenCLKraskovCMI(OpenCLKraskov):
         var2dim = var2.shape[1]
         conddim = conditional.shape[1]
         pointdim = var1dim + var2dim + conddim
-        kraskov_k = self.settings['kraskov_k']
 
-        mem_data = self.sizeof_float * chunklength * pointdim
-        mem_dist = self.sizeof_float * chunklength * kraskov_k
-        mem_ncnt = 2 * self.sizeof_int * chunklength
-        mem_chunk = mem_data + mem_dist + mem_ncnt
+        mem_data = self.sizeof_point * chunklength * pointdim
+        mem_dist = self.sizeof_float * chunklength * self._n_stored_dist()
+        mem_ncnt = 3 * self.sizeof_int * chunklength
+        mem_sums = 3 * np.dtype(np.float64).itemsize
+        mem_chunk = mem_data + mem_dist + mem_ncnt + mem_sums
+        mem_run = self._get_mem_per_run(chunklength, n_subspaces=3)
         max_mem = self._get_max_mem()
 
-        max_chunks_per_run = np.floor(max_mem/mem_chunk).astype(int)
-        chunks_per_run = min(max_chunks_per_run, n_chunks)
+        # Distribute chunks evenly over all devices. Runs are assigned to
+        # devices in turn.
+        n_queues = len(self.queues)
+        max_chunks_per_run = int((max_mem - mem_run) // mem_chunk)
+        chunks_per_run = min(max_chunks_per_run,
+                             -(-n_chunks // n_queues))
+        # If data has to be processed in multiple runs per device, keep two
+        # runs on each device, such that the next run is prepared on the host
+        # while the current run is processed on the device.
+        max_chunks_per_run_2 = int((max_mem - 2 * mem_run) // (2 * mem_chunk))
+        if chunks_per_run * n_queues < n_chunks and max_chunks_per_run_2 > 0:
+            chunks_per_run = max_chunks_per_run_2
+            runs_in_flight = 2 * n_queues
+        else:
+            runs_in_flight = n_queues
 
         logger.debug(
             'Memory per chunk: {0:.5f} MB, GPU global memory: {1} MB, chunks '
             'per run: {2}.'.format(
                 mem_chunk / C, max_mem / C, chunks_per_run))
-        if mem_chunk > max_mem:
+        if mem_chunk + mem_run > max_mem:
             raise RuntimeError('Size of single chunk exceeds GPU global '
                                'memory.')
 
-        cmi_array = np.array([])
-        if self.settings['debug']:
-            distances = np.array([])
-            count_var1 = np.array([])
-            count_var2 = np.array([])
-            count_cond = np.array([])
-
-        for r in range(0, n_chunks, chunks_per_run):
+        # Each run in flight uses its own slot of cached device buffers,
+        # release buffers of slots not used in this call and of slots that
+        # would hold more than their share of the memory budget of each device
+        # once grown to the sizes needed by this call.
+        self._release_buffers(
+            first_slot=runs_in_flight,
+            buffer_sizes=self._get_buffer_sizes(
+                pointdim, 3, chunklength, chunks_per_run),
+            max_slot_size=max_mem // (runs_in_flight // n_queues))
+        runs = []
+        all_results = []
+        for i, r in enumerate(range(0, n_chunks, chunks_per_run)):
             startidx = r*chunklength
             stopidx = min(r+chunks_per_run, n_chunks)*chunklength
             subset1 = var1[startidx:stopidx, :]
             subset2 = var2[startidx:stopidx, :]
             subset3 = conditional[startidx:stopidx, :]
             n_chunks_current_run = subset1.shape[0] // chunklength
-            results = self._estimate_single_run(subset1, subset2, subset3,
-                                                n_chunks_current_run)
-            if self.settings['debug']:
-                cmi_array = np.concatenate((cmi_array,  results[0]))
-                distances = np.concatenate((distances,  results[1]))
-                count_var1 = np.concatenate((count_var1, results[2]))
-                count_var2 = np.concatenate((count_var2, results[3]))
-                count_cond = np.concatenate((count_cond, results[4]))
-            else:
-                cmi_array = np.concatenate((cmi_array, results))
-
+            runs.append(self._enqueue_single_run(
+                subset1, subset2, subset3, n_chunks_current_run,
+                device=i % n_queues, slot=i % runs_in_flight))
+            if len(runs) == runs_in_flight:
+                all_results.append(self._finish_single_run(runs.pop(0)))
+        all_results += [self._finish_single_run(run) for run in runs]
+
+        results = self._concatenate_runs(all_results)
         if self.settings['return_counts']:
-            return cmi_array, distances, count_var1, count_var2, count_cond
+            # cmi_array, distances, count_var1, count_var2, count_cond
+            return results
+        elif self.settings['debug']:
+            return results[0]
         else:
-            return cmi_array
+            return results
 
     def _estimate_single_run(self, var1, var2, conditional=None, n_chunks=1):
         """Estimate conditional mutual information in a single GPU run.
@@ -632,10 +1033,46 @@ class OpenCLKraskovCMI(OpenCLKraskov):
                 average CMI over all samples or local CMI for individual
                 samples if 'local_values'=True
         """
-        # Return MI if no conditional is provided
+        # Return MI if no conditional is provided, see estimate()
         if conditional is None:
-            est_mi = OpenCLKraskovMI(self.settings)
-            return est_mi.estimate(var1, var2, n_chunks)
+            return self.estimate(var1, var2, n_chunks=n_chunks)
+
+        return self._finish_single_run(
+            self._enqueue_single_run(var1, var2, conditional, n_chunks))
+
+    def _enqueue_single_run(self, var1, var2, conditional, n_chunks=1,
+                            device=0, slot=0):
+        """Prepare data and enqueue a single GPU run without waiting for it.
+
+        Prepare the point set on the host, then enqueue the upload, the
+        neighbour searches, and the read-back of results without blocking, such
+        that the host is free to prepare the next run while the device is busy.
+        Pass the returned run to _finish_single_run() to obtain estimates.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, see _estimate_single_run()
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            conditional : numpy array
+                realisations of conditioning variable (similar to var1)
+            n_chunks : int
+                number of data chunks, no. data points has to be the same for
+                each chunk
+            device : int [optional]
+                index of the device used for this run into the list of devices
+                set by gpuid (default=0)
+            slot : int [optional]
+                slot of cached device buffers used for this run, runs in
+                flight at the same time must use different slots (default=0)
+
+        Returns:
+            dict
+                enqueued run, i.e., device buffers, host arrays for results,
+                and events of pending read-backs
+        """
+        queue = self.queues[device]
+        copy_queue = self.copy_queues[device]
 
         # Prepare data and add noise: check if variable realisations are passed
         # as 1D or 2D arrays and have equal no. observations.
@@ -653,163 +1090,159 @@ class OpenCLKraskovCMI(OpenCLKraskov):
         conddim = conditional.shape[1]
         pointdim = var1dim + var2dim + conddim
 
-        # prepare padding
-        signallength_orig = signallength
-
-        if self.settings['padding']:
-            # Pad time series to make GPU memory regions a multiple of 4096
-            # 4096 is the largestknown value for opencl subbuffer alignment targets
-            # but see comment in MI estimator above
-            pad_target = 4096
-            pad_size = (int(np.ceil(signallength/pad_target)) * pad_target -
-                        signallength)
-            pad_var1 = np.vstack(
-                [var1, 999999 + 0.1 * np.random.rand(pad_size, var1dim)])
-            pad_var2 = np.vstack(
-                [var2, 999999 + 0.1 * np.random.rand(pad_size, var2dim)])
-            pad_conditional = np.vstack(
-                [conditional, 999999 + 0.1 * np.random.rand(pad_size, conddim)])
-            pointset = np.hstack((pad_var1, pad_conditional, pad_var2)).T.copy()
-            signallength_padded = signallength + pad_size
-        else:
-            pad_size = 0
-            pointset = np.hstack((var1, conditional, var2)).T.copy()
-            signallength_padded = signallength
-
-        if not pointset.dtype == np.float32:
-            pointset = pointset.astype(np.float32)
-        if self.settings['noise_level'] > 0:
-            pointset += np.random.normal(
-                scale=self.settings['noise_level'],
-                size=pointset.shape).astype(np.float32)
+        # Assemble the point set [var1, conditional, var2], with one row per
+        # dimension.
+        pointset = self._build_pointset(var1, conditional, var2)
 
         if self.settings['debug']:
-            # Print memory requirements after padding
-            mem_data_pad = (self.sizeof_float *
-                            pointset.shape[0] * pointset.shape[1])
-            mem_dist = (self.sizeof_float * signallength_padded *
-                        self.settings['kraskov_k'])
-            mem_ncnt = 2 * self.sizeof_int * signallength_padded
-            mem_total = mem_data_pad + mem_dist + mem_ncnt
-            logger.debug(
-                'Memory req. after padding: {0:.2f} MB ({1} elements) -- Padding: {2}.'.format(
-                      mem_total / C, pointset.size, pad_size))
+            # Print memory requirements
+            mem_data = (self.sizeof_point *
+                        pointset.shape[0] * pointset.shape[1])
+            mem_dist = (self.sizeof_float * signallength *
+                        self._n_stored_dist())
+            mem_ncnt = 3 * self.sizeof_int * signallength
+            mem_total = mem_data + mem_dist + mem_ncnt
+            logger.debug('Memory req.: {0:.2f} MB ({1} elements).'.format(
+                mem_total / C, pointset.size))
 
         # Set OpenCL kernel launch parameters
-        if chunklength < self.devices[
-                                self.settings['gpuid']].max_work_group_size:
-            workitems_x = 8
-        elif self.devices[self.settings['gpuid']].max_work_group_size < 256:
-            workitems_x = self.devices[
-                                self.settings['gpuid']].max_work_group_size
-        else:
-            workitems_x = 256
-        NDRange_x = (workitems_x *
-                     (int((signallength_padded - 1)/workitems_x) + 1))
+        NDRange_x, workitems_x = self._get_launch_params(
+            chunklength, signallength)
 
         # Allocate and copy memory to device
         kraskov_k = self.settings['kraskov_k']
-        d_pointset = cl.Buffer(
-                    self.context,
-                    cl.mem_flags.READ_ONLY | cl.mem_flags.COPY_HOST_PTR,
-                    hostbuf=pointset)
-        d_src = d_pointset.get_sub_region(
-                    0,
-                    self.sizeof_float * signallength_padded * var1dim,
-                    cl.mem_flags.READ_ONLY)
-        d_cnd = d_pointset.get_sub_region(
-                    self.sizeof_float * signallength_padded * var1dim,
-                    self.sizeof_float * signallength_padded * conddim,
-                    cl.mem_flags.READ_ONLY)
-        d_distances = cl.Buffer(
-                    self.context, cl.mem_flags.READ_WRITE,
-                    self.sizeof_float * kraskov_k * signallength_padded)
-        d_vecradius = d_distances.get_sub_region(
-                    signallength_padded * (kraskov_k - 1) * self.sizeof_float,
-                    signallength_padded * self.sizeof_float)
-        d_npointsrange_x = cl.Buffer(self.context,
-                                     cl.mem_flags.READ_WRITE,
-                                     self.sizeof_int * signallength_padded)
-        d_npointsrange_y = cl.Buffer(self.context, cl.mem_flags.READ_WRITE,
-                                     self.sizeof_int * signallength_padded)
-        d_npointsrange_z = cl.Buffer(self.context, cl.mem_flags.READ_WRITE,
-                                     self.sizeof_int * signallength_padded)
-
-        # Neighbour search in full space
+        d_pointset, uploads = self._get_pointset_buffer(
+            copy_queue, pointset, slot)
+        # The point set is ordered [var1, conditional, var2], such that all
+        # subspaces used in the range searches are unions of consecutive
+        # blocks of dimensions: [var1, conditional] are blocks 0-1,
+        # [conditional, var2] are blocks 1-2, and [conditional] is block 1.
+        # Pass blocks as dimension boundaries and subspaces as (first block,
+        # no. blocks) to the neighbour search kernel, which computes the
+        # distance within each block once for all subspaces.
+        blocks = np.array([0, var1dim, var1dim + conddim, pointdim],
+                          dtype=np.int32)
+        subspaces = np.array([[0, 2],
+                              [1, 2],
+                              [1, 1]], dtype=np.int32)
+        n_subspaces = subspaces.shape[0]
+        d_blocks = self._get_buffer('blocks', blocks.nbytes, slot)
+        uploads.append(cl.enqueue_copy(copy_queue, d_blocks, blocks,
+                                       is_blocking=False))
+        d_subspaces = self._get_buffer('subspaces', subspaces.nbytes, slot)
+        uploads.append(cl.enqueue_copy(copy_queue, d_subspaces, subspaces,
+                                       is_blocking=False))
+        # The kernel waits for the uploads from another queue, which requires
+        # the uploads to be flushed to the device first.
+        copy_queue.flush()
+        # Only the kth distance is needed to estimate CMI, all k distances are
+        # stored and read back in debug mode only.
+        n_dist = self._n_stored_dist()
+        d_distances = self._get_buffer(
+                    'distances',
+                    self.sizeof_float * n_dist * signallength, slot)
+        d_npointsrange = self._get_buffer(
+                    'counts',
+                    self.sizeof_int * n_subspaces * signallength, slot)
+
+        # Neighbour search in full space and range searches in source and
+        # conditional, target and conditional, and conditional. Data is
+        # uploaded through the copy queue, wait for the uploads. Point sets are
+        # not padded, such that the row stride equals the signal length.
         theiler_t = np.int32(self.settings['theiler_t'])
         localmem = cl.LocalMemory(self.sizeof_float * kraskov_k * workitems_x)
-        self.kNN_kernel(self.queue, (NDRange_x,), (workitems_x,), d_pointset,
-                        d_pointset, d_distances, np.int32(pointdim),
-                        np.int32(chunklength), np.int32(signallength_padded),
-                        np.int32(signallength_orig),
-                        np.int32(kraskov_k),
-                        theiler_t, localmem)  # MW: added signallength_orig
-        distances = np.zeros(signallength_padded * kraskov_k, dtype=np.float32)
-        cl.enqueue_copy(self.queue, distances, d_distances)
-        self.queue.finish()
-
-        # Range search in source and conditional
-        localmem = cl.LocalMemory(self.sizeof_int * workitems_x)
-        self.RS_kernel(self.queue, (NDRange_x,), (workitems_x,), d_src, d_src,
-                       d_vecradius, d_npointsrange_x, var1dim + conddim,
-                       chunklength, signallength_padded, signallength_orig,
-                       theiler_t, localmem)  # MW: added signallength_orig
-        count_src = np.zeros(signallength_padded, dtype=np.int32)
-        cl.enqueue_copy(self.queue, count_src, d_npointsrange_x)
-
-        # Range search in target and conditional
-        self.RS_kernel(self.queue, (NDRange_x,), (workitems_x,), d_cnd, d_cnd,
-                       d_vecradius, d_npointsrange_y, var2dim + conddim,
-                       chunklength, signallength_padded,  signallength_orig,
-                       theiler_t, localmem)  # MW: added signallength_orig
-        count_tgt = np.zeros(signallength_padded, dtype=np.int32)
-        cl.enqueue_copy(self.queue, count_tgt, d_npointsrange_y)
-
-        # Range search in conditional
-        self.RS_kernel(self.queue, (NDRange_x,), (workitems_x,), d_cnd, d_cnd,
-                       d_vecradius, d_npointsrange_z, conddim, chunklength,
-                       signallength_padded, signallength_orig,
-                       theiler_t, localmem)  # MW: added signallength_orig
-        count_cnd = np.zeros(signallength_padded, dtype=np.int32)
-        cl.enqueue_copy(self.queue, count_cnd, d_npointsrange_z)
-
-        d_pointset.release()
-        d_distances.release()
-        d_npointsrange_x.release()
-        d_npointsrange_y.release()
-        d_npointsrange_z.release()
-        d_src.release()
-        d_cnd.release()
-        d_vecradius.release()
+        self.kNN_RS_kernel(queue, (NDRange_x,), (workitems_x,),
+                           d_pointset, d_distances, d_npointsrange, d_blocks,
+                           d_subspaces, len(blocks) - 1, n_subspaces,
+                           pointdim, chunklength,
+                           signallength, signallength, kraskov_k,
+                           theiler_t, self.settings['debug'], localmem,
+                           wait_for=uploads)
+        if self._sum_digammas_on_device():
+            counts = None
+            sums, events = self._enqueue_digamma_sums(
+                queue, d_npointsrange, n_subspaces, n_chunks, chunklength,
+                signallength, slot)
+        else:
+            sums = None
+            counts = np.empty((n_subspaces, signallength),
+                              dtype=np.int32)
+            events = [cl.enqueue_copy(queue, counts, d_npointsrange,
+                                      is_blocking=False)]
+        if self.settings['debug']:
+            distances = np.empty(signallength * kraskov_k,
+                                 dtype=np.float32)
+            events.append(cl.enqueue_copy(queue, distances, d_distances,
+                                          is_blocking=False))
+        else:
+            distances = None
+
+        # Submit all commands to the device now instead of when the host
+        # first waits for this run, such that runs on different devices are
+        # processed concurrently.
+        queue.flush()
+
+        # Keep host arrays alive until all non-blocking copies have finished.
+        return {'pointset': pointset,
+                'blocks': blocks,
+                'subspaces': subspaces,
+                'events': events,
+                'distances': distances,
+                'counts': counts,
+                'sums': sums,
+                'n_chunks': n_chunks,
+                'chunklength': chunklength,
+                'signallength': signallength}
+
+    def _finish_single_run(self, run):
+        """Wait for an enqueued GPU run and estimate CMI from its results.
 
-        # Calculate and sum digammas
-        if self.settings['local_values']:
-            cmi_array = -np.inf * np.ones(n_chunks * chunklength,
-                                          dtype=np.float64)
-            idx = 0
-            for c in range(n_chunks):
-                cmi = (digamma(kraskov_k) +
-                       digamma(count_cnd[c*chunklength:(c+1)*chunklength]+1) -
-                       digamma(count_src[c*chunklength:(c+1)*chunklength]+1) -
-                       digamma(count_tgt[c*chunklength:(c+1)*chunklength]+1))
-                cmi_array[idx:idx+chunklength] = cmi
-                idx += chunklength
+        Args:
+            run : dict
+                run returned by _enqueue_single_run()
 
+        Returns:
+            float | numpy array
+                average CMI over all samples or local CMI for individual
+                samples if 'local_values'=True
+        """
+        cl.wait_for_events(run['events'])
+        n_chunks = run['n_chunks']
+        chunklength = run['chunklength']
+        signallength = run['signallength']
+        distances = run['distances']
+        counts = run['counts']
+        kraskov_k = self.settings['kraskov_k']
+
+        assert signallength == n_chunks * chunklength, 'Original signal length does not match no. processed points.'
+        if run['sums'] is not None:
+            # Digammas were summed per chunk on the device, sums are ordered
+            # as source, target, conditional.
+            sums = run['sums']
+            return digamma(kraskov_k) + (
+                sums[:, 2] - sums[:, 0] - sums[:, 1]) / chunklength
+
+        # Calculate and sum digammas. Neighbour counts are integers bounded by
+        # the chunk length, so look up digamma(count + 1) in a table instead of
+        # evaluating digamma for every point.
+        digamma_lut = digamma(np.arange(1, counts.max() + 2))
+        count_src, count_tgt, count_cnd = counts
+        # Accumulate in place to avoid allocating intermediate arrays.
+        cmi_local = digamma_lut[count_cnd]
+        cmi_local -= digamma_lut[count_src]
+        cmi_local -= digamma_lut[count_tgt]
+        if self.settings['local_values']:
+            cmi_local += digamma(kraskov_k)
+            cmi_array = cmi_local
         else:
-            cmi_array = -np.inf * np.ones(n_chunks, dtype=np.float64)
-            for c in range(n_chunks):
-                cmi = (digamma(kraskov_k) + np.mean(
-                        digamma(count_cnd[c*chunklength:(c+1)*chunklength]+1) -
-                        digamma(count_src[c*chunklength:(c+1)*chunklength]+1) -
-                        digamma(count_tgt[c*chunklength:(c+1)*chunklength]+1)))
-                cmi_array[c] = cmi
-        assert signallength_orig == (c+1)*chunklength, 'Original signal length does not match no. processed points.'
+            cmi_array = digamma(kraskov_k) + np.mean(
+                cmi_local.reshape(n_chunks, chunklength), axis=1)
 
         if self.settings['debug']:
             return (cmi_array,
-                    distances[:signallength_orig],
-                    count_src[:signallength_orig],
-                    count_tgt[:signallength_orig],
-                    count_cnd[:signallength_orig])
+                    distances[:signallength],
+                    count_src,
+                    count_tgt,
+                    count_cnd)
         else:
             return cmi_array
@@ -2,6 +2,35 @@
 #define INFINITY 0x7F800000
 #endif
 
+/*
+ * Point sets are stored as 32-bit floats by default. If HALF_STORAGE is
+ * defined, point sets are stored as 16-bit floats, if BF16_STORAGE is defined,
+ * point sets are stored as bfloat16, i.e., the upper 16 bits of a 32-bit
+ * float. Points are converted to 32-bit floats on load, distances are always
+ * computed in 32-bit precision.
+ */
+#if defined(HALF_STORAGE)
+#define POINT_T half
+#define LOAD_POINT(p) vload_half(0, (p))
+#elif defined(BF16_STORAGE)
+#define POINT_T ushort
+#define LOAD_POINT(p) as_float(((uint)(*(p))) << 16)
+#else
+#define POINT_T float
+#define LOAD_POINT(p) (*(p))
+#endif
+
+/*
+ * The number of nearest neighbours is passed to the KNN kernel at run time.
+ * If KTH is defined at compile time, it replaces the run-time value, such that
+ * the compiler can unroll loops over the k nearest neighbours.
+ */
+#ifdef KTH
+#define GET_KTH(k) KTH
+#else
+#define GET_KTH(k) (k)
+#endif
+
 float insertPointKlist(
     int kth,
     float distance,
@@ -23,8 +52,8 @@ float insertPointKlist(
 }
 
 float maxMetricPoints(
-    __global const float* g_uquery,
-    __global const float* g_vpoint,
+    __global const POINT_T* g_uquery,
+    __global const POINT_T* g_vpoint,
     long pointdim,
     long signallength_padded)
 {
@@ -35,8 +64,8 @@ float maxMetricPoints(
 	r_dim=0;
 	for(long d=0; d<pointdim; d++)
         {
-		r_u1 = *(g_uquery+d*signallength_padded);
-		r_v1 = *(g_vpoint+d*signallength_padded);
+		r_u1 = LOAD_POINT(g_uquery+d*signallength_padded);
+		r_v1 = LOAD_POINT(g_vpoint+d*signallength_padded);
 		r_d1 = r_v1 - r_u1;
 		r_d1 = r_d1 < 0? -r_d1: r_d1;  //abs
 		r_dim= r_dim < r_d1? r_d1: r_dim;
@@ -45,118 +74,194 @@ float maxMetricPoints(
 }
 
 /*
- * KNN
- * Note: for strides in memory (e.g. going from var to var, or dim to dim
- * use signallength_padded, for checking whether all requested work has been
- * done use signallength_orig
-* tid indexes all points once for which we seek the neighbours
-* ichunk and chunklength determine in which piece of the data
-* neighbours are being searched for a given reference point (tid)
+ * KNN and radius search in multiple subspaces
+ * Note: for strides in memory (e.g. going from dim to dim) use
+ * signallength_padded, for checking whether all requested work has been done
+ * use signallength_orig. tid indexes all points once for which we seek the
+ * neighbours, ichunk and chunklength determine in which piece of the data
+ * neighbours are being searched for a given reference point (tid). Queries
+ * with tid>=signallength_orig return immediately and candidates are taken
+ * from the query's chunk only, such that padded points are never searched.
+ * For each point, the distance to its kth nearest neighbour in the full space
+ * is determined in a first pass over the chunk. This distance is then used as
+ * search radius to count neighbours in all subspaces of the point set in a
+ * second pass, such that search radii never have to be written to and read
+ * from global memory.
+ * All k distances are written to g_distances if store_all is set, otherwise
+ * only the kth distance is written to g_distances[tid].
+ * Dimensions are grouped into contiguous blocks, g_blocks holds the
+ * n_blocks+1 block boundaries, such that block b covers dimensions
+ * g_blocks[b] to g_blocks[b+1]-1. Subspaces are unions of consecutive blocks
+ * and are passed in g_subspaces as pairs of (index of first block, no.
+ * blocks). For each candidate neighbour, the maximum distance within each
+ * block is computed once and shared by all subspaces containing the block.
+ * Counts for subspace s are written to g_npoints[s*signallength_padded + tid].
  */
 
-__kernel void kernelKNNshared(
-    __global const float* g_uquery,
-    __global const float* g_vpointset,
+#define MAX_BLOCKS 3
+#define MAX_SUBSPACES 3
+
+__kernel void kernelKNNRSMultishared(
+    __global const POINT_T* g_pointset,
     __global float* g_distances,
+    __global int* g_npoints,
+    __global const int* g_blocks,
+    __global const int* g_subspaces,
+    const int n_blocks,
+    const int n_subspaces,
     const int pointdim,
     const int chunklength,
-    const int signallength_padded, // signallength after padding
+    const int signallength_padded,
     const int signallength_orig, // original signal length before padding
-    const int kth,
+    const int kth_arg,
     const int exclude,
+    const int store_all, // write all k distances or only the kth distance
     __local float* kdistances)
 {
-	const unsigned int tid = get_global_id(0)+get_global_id(1)*get_global_size(0); //Global identifier - this takes the 2D memory (vars(dims))*(chunks(samples)) and maps it to a 1-D location
-	const unsigned int ichunk = tid / chunklength; //Chunk index, this should not be bigger than
+	const int kth = GET_KTH(kth_arg);
+	const unsigned int tid = get_global_id(0); //Global identifier
+	const unsigned int ichunk = tid / chunklength; //Chunk index
 
-	if (tid<signallength_orig) // Do not start another chunk when the things that should be originally computed have been done (was: tid<signallength_padded)
+	if (tid<signallength_orig) // Skip work items beyond the last point
 	{
+		__local float* r_kdistances = kdistances+get_local_id(0)*kth;
 		for (int k=0; k<kth; k++)
 		{
-			kdistances[get_local_id(0)*kth + k] = INFINITY;
+			r_kdistances[k] = INFINITY;
 		}
 
-	    barrier(CLK_LOCAL_MEM_FENCE);
-
-	    float r_kdist=INFINITY;
-	    unsigned int indexi = tid-chunklength*ichunk; //Position inside the chunk
-
-	    for(int t=0; t<chunklength; t++)
-	    {
-		    int indexu = tid; //Current position
-		    int indexv = (t + ichunk*chunklength); //Read all chunk members
-		    int condition1=indexi-exclude;
-		    int condition2=indexi+exclude;
-		    //Exclude = thelier. If thelier = 0, analize all points except the actual one
-		    if((t<condition1)||(t>condition2))
-		    {
-			    float temp_dist = maxMetricPoints(g_uquery+indexu, g_vpointset+indexv, pointdim, signallength_padded);
-			    if(temp_dist <= r_kdist)
-			    {
-				    r_kdist = insertPointKlist(kth,temp_dist,t,kdistances+get_local_id(0)*kth);
-			    }
-		    }
-	    }
-	    barrier(CLK_LOCAL_MEM_FENCE);
-
-	    //Copy to global memory
-	    for(int k=0; k<kth; k++)
-	    {
-		    g_distances[tid+k*signallength_padded] = kdistances[get_local_id(0)*kth+k];
-	    }
-    }
-}
-
-/*
- * Radius shared
- */
-
-__kernel void kernelBFRSAllshared(
-    __global const float* g_uquery,
-    __global const float* g_vpointset,
-    __global const float* vecradius,
-    __global int* g_npoints,
-    const int pointdim,
-    const int chunklength,
-    const int signallength_padded,
-    const int signallength_orig, // original signal length before padding
-    const int exclude,
-    __local int* s_npointsrange2) //Best performance without using shared/local memory)
-{
-
-	float radius=0;
+		float r_kdist=INFINITY;
+		unsigned int indexi = tid-chunklength*ichunk; //Position inside the chunk
+		int condition1=indexi-exclude;
+		int condition2=indexi+exclude;
 
-	int s_npointsrange;
-
-	const unsigned int tid = get_global_id(0)+get_global_id(1)*get_global_size(0); //Global identifier
-	const unsigned int ichunk = tid / chunklength; //Chunk index
+		//KNN search in full space
+		for(int t=0; t<chunklength; t++)
+		{
+			int indexv = (t + ichunk*chunklength);
+			if((t<condition1)||(t>condition2))
+			{
+				float temp_dist = maxMetricPoints(g_pointset+tid, g_pointset+indexv, pointdim, signallength_padded);
+				if(temp_dist <= r_kdist)
+				{
+					r_kdist = insertPointKlist(kth,temp_dist,t,r_kdistances);
+				}
+			}
+		}
 
-	if(tid<signallength_orig) // see kernelKNNshared
-	{
-		s_npointsrange= 0;
+		if(store_all)
+		{
+			for(int k=0; k<kth; k++)
+			{
+				g_distances[tid+k*signallength_padded] = r_kdistances[k];
+			}
+		}
+		else
+		{
+			g_distances[tid] = r_kdist;
+		}
 
-	    radius = *(vecradius+tid);
-		unsigned int indexi = tid-chunklength*ichunk;
+		//Range searches in subspaces with the kth distance as radius
+		int r_blocks[MAX_BLOCKS+1];
+		for(int b=0; b<=n_blocks; b++)
+		{
+			r_blocks[b] = g_blocks[b];
+		}
+		int r_subspaces[2*MAX_SUBSPACES];
+		int s_npointsrange[MAX_SUBSPACES];
+		for(int s=0; s<n_subspaces; s++)
+		{
+			r_subspaces[2*s] = g_subspaces[2*s];
+			r_subspaces[2*s+1] = g_subspaces[2*s+1];
+			s_npointsrange[s] = 0;
+		}
 		for(int t=0; t<chunklength; t++)
 		{
-			int indexu = tid;
 			int indexv = (t + ichunk*chunklength);
-			int condition1=indexi-exclude;
-			int condition2=indexi+exclude;
 			if((t<condition1)||(t>condition2))
 			{
-				float temp_dist = maxMetricPoints(g_uquery+indexu, g_vpointset+indexv,pointdim, signallength_padded);
-				if(temp_dist < radius)
+				//Max. distance within each block, shared by all subspaces
+				float r_bdist[MAX_BLOCKS];
+				for(int b=0; b<n_blocks; b++)
 				{
-					s_npointsrange++;
+					long offset = (long)r_blocks[b]*signallength_padded;
+					r_bdist[b] = maxMetricPoints(g_pointset+offset+tid, g_pointset+offset+indexv, r_blocks[b+1]-r_blocks[b], signallength_padded);
+				}
+				for(int s=0; s<n_subspaces; s++)
+				{
+					float temp_dist = 0;
+					for(int b=r_subspaces[2*s]; b<r_subspaces[2*s]+r_subspaces[2*s+1]; b++)
+					{
+						temp_dist = temp_dist < r_bdist[b]? r_bdist[b]: temp_dist;
+					}
+					if(temp_dist < r_kdist)
+					{
+						s_npointsrange[s]++;
+					}
 				}
 			}
 		}
 
-	    barrier(CLK_LOCAL_MEM_FENCE);
-        //COPY TO GLOBAL MEMORY
-	    g_npoints[tid] = s_npointsrange;
+		for(int s=0; s<n_subspaces; s++)
+		{
+			g_npoints[s*signallength_padded + tid] = s_npointsrange[s];
+		}
 	}
 }
 
+/*
+ * Sum digamma(count + 1) over all points of a chunk for each subspace.
+ * One work group processes one chunk, the work group size has to be a power
+ * of two. Digamma values are looked up in g_digamma, where
+ * g_digamma[n] = digamma(n + 1). Counts for subspace s are read from
+ * g_npoints[s*signallength_padded + tid] as written by kernelKNNRSMultishared,
+ * the sum for chunk c and subspace s is written to g_sums[c*n_subspaces + s].
+ * Lookup and summation use double precision, such that sums match sums
+ * calculated on the host, the kernel is only available on devices supporting
+ * cl_khr_fp64.
+ */
+
+#ifdef cl_khr_fp64
+#pragma OPENCL EXTENSION cl_khr_fp64 : enable
 
+__kernel void kernelDigammaReduce(
+    __global const int* g_npoints,
+    __global const double* g_digamma,
+    __global double* g_sums,
+    const int n_subspaces,
+    const int chunklength,
+    const int signallength_padded,
+    __local double* partial)
+{
+	const unsigned int lid = get_local_id(0);
+	const unsigned int lsize = get_local_size(0);
+	const unsigned int ichunk = get_group_id(0);
+
+	for(int s=0; s<n_subspaces; s++)
+	{
+		__global const int* g_counts = g_npoints + s*signallength_padded + ichunk*chunklength;
+		double sum = 0.0;
+		for(int t=lid; t<chunklength; t+=lsize)
+		{
+			sum += g_digamma[g_counts[t]];
+		}
+		partial[lid] = sum;
+		barrier(CLK_LOCAL_MEM_FENCE);
+
+		// Tree reduction of the partial sums in local memory
+		for(unsigned int stride=lsize/2; stride>0; stride>>=1)
+		{
+			if(lid<stride)
+			{
+				partial[lid] += partial[lid+stride];
+			}
+			barrier(CLK_LOCAL_MEM_FENCE);
+		}
+		if(lid==0)
+		{
+			g_sums[ichunk*n_subspaces + s] = partial[0];
+		}
+		barrier(CLK_LOCAL_MEM_FENCE);
+	}
+}
+#endif
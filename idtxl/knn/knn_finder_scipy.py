@@ -18,7 +18,12 @@ class ScipyKDTreeKnnFinder(TreeKnnFinder):
         self._tree = KDTree(data, leafsize=self._leaf_size)
 
     def find_neighbors(self, x: np.ndarray, k: int) -> np.ndarray:
-        return self._tree.query(x, k=k, p=np.inf, workers=self._num_threads)
+        return self._tree.query(x, k=k, p=self._p, workers=self._num_threads)
+
+    def find_dist_to_kth_neighbor(self, x: np.ndarray, k: int) -> np.ndarray:
+        # Query only the kth neighbor instead of all k neighbors
+        dist, _ = self._tree.query(x, k=[k], p=self._p, workers=self._num_threads)
+        return dist[:, 0]
 
     def find_neighbors_within(self, x: np.array, r: float) -> np.ndarray:
         return self._tree.query_ball_point(
@@ -46,8 +46,12 @@ def test_debug_setting():
         'correct no. values.')
 
 
-def test_amd_data_padding():
-    """Test padding necessary for AMD devices."""
+def test_unaligned_data_sizes():
+    """Test data sizes that are not aligned to work group or memory sizes.
+
+    Point sets used to be padded for AMD devices, they are now passed to the
+    device without padding for any no. points and chunks.
+    """
     expected_mi, source, source_uncorr, target = _get_gauss_data(seed=SEED)
 
     settings = {'debug': True, 'return_counts': True}
@@ -541,6 +545,73 @@ def test_insufficient_no_points():
     with pytest.raises(RuntimeError): est.estimate(source1, target, target)
 
 
+def test_rng_seed():
+    """Test reproducibility of noise added to the data."""
+    expected_mi, source, source_uncorr, target = _get_gauss_data(
+        n=1000, seed=SEED)
+    settings = {'noise_level': 0.1, 'rng_seed': SEED, 'debug': True,
+                'return_counts': True}
+    res_1 = OpenCLKraskovCMI(settings).estimate(source, target, source_uncorr)
+    res_2 = OpenCLKraskovCMI(settings).estimate(source, target, source_uncorr)
+    for r1, r2 in zip(res_1, res_2):
+        assert np.array_equal(r1, r2), (
+            'Estimates differ for identical random seeds.')
+    settings['rng_seed'] = SEED + 1
+    res_3 = OpenCLKraskovCMI(settings).estimate(source, target, source_uncorr)
+    assert not np.array_equal(res_1[1], res_3[1]), (
+        'Distances do not differ for different random seeds.')
+
+
+def test_storage_dtype():
+    """Test storage of point sets as 16-bit floats and bfloat16."""
+    expected_mi, source, source_uncorr, target = _get_gauss_data(
+        n=3000, seed=SEED)
+    with pytest.raises(RuntimeError):
+        OpenCLKraskovCMI(settings={'storage_dtype': 'int8'})
+
+    # Compare estimates per chunk against float32 storage. 16-bit storage
+    # biases estimates upwards, tolerances are set above the largest
+    # deviations observed for this data (0.005 nats for float16, 0.022 nats
+    # for bfloat16).
+    n_chunks = 10
+    settings = {'noise_level': 0}
+    mi = OpenCLKraskovMI(settings).estimate(
+        source, target, n_chunks=n_chunks)
+    cmi = OpenCLKraskovCMI(settings).estimate(
+        source, target, source_uncorr, n_chunks=n_chunks)
+    settings['storage_dtype'] = 'float16'
+    mi_half = OpenCLKraskovMI(settings).estimate(
+        source, target, n_chunks=n_chunks)
+    cmi_half = OpenCLKraskovCMI(settings).estimate(
+        source, target, source_uncorr, n_chunks=n_chunks)
+    print('OpenCL MI result: {0:.4f} nats (float32), {1:.4f} nats (float16); '
+          'OpenCL CMI result: {2:.4f} nats (float32), {3:.4f} nats '
+          '(float16).'.format(mi[0], mi_half[0], cmi[0], cmi_half[0]))
+    assert np.allclose(mi, mi_half, rtol=0, atol=0.01), (
+        'MI estimate using float16 storage differs from float32 estimate.')
+    assert np.allclose(cmi, cmi_half, rtol=0, atol=0.01), (
+        'CMI estimate using float16 storage differs from float32 estimate.')
+
+    # Data exceeding the range of float16 can not be stored.
+    with pytest.raises(RuntimeError):
+        OpenCLKraskovMI(settings).estimate(source * 1e5, target)
+
+    # bfloat16 keeps the range of float32.
+    settings['storage_dtype'] = 'bfloat16'
+    mi_bf16 = OpenCLKraskovMI(settings).estimate(
+        source, target, n_chunks=n_chunks)
+    cmi_bf16 = OpenCLKraskovCMI(settings).estimate(
+        source, target, source_uncorr, n_chunks=n_chunks)
+    assert np.allclose(mi, mi_bf16, rtol=0, atol=0.03), (
+        'MI estimate using bfloat16 storage differs from float32 estimate.')
+    assert np.allclose(cmi, cmi_bf16, rtol=0, atol=0.03), (
+        'CMI estimate using bfloat16 storage differs from float32 estimate.')
+    mi_bf16_scaled = OpenCLKraskovMI(settings).estimate(
+        source * 1e5, target * 1e5, n_chunks=n_chunks)
+    assert np.allclose(mi_bf16, mi_bf16_scaled, rtol=0, atol=0.02), (
+        'MI estimate using bfloat16 storage is not scale invariant.')
+
+
 @jpype_missing
 def test_multi_gpu():
     """Test use of multiple GPUs."""
@@ -574,11 +645,125 @@ def test_multi_gpu():
                         'OpenCL estimator failed (error larger 0.05).')
 
 
+def test_multi_gpu_chunks():
+    """Test distribution of chunks over multiple devices."""
+    expected_mi, source, source_uncorr, target = _get_gauss_data(
+        n=1000, seed=SEED)
+    n_chunks = 5
+    settings = {'noise_level': 0, 'debug': True, 'return_counts': True}
+    res = OpenCLKraskovCMI(settings).estimate(
+        source, target, source_uncorr, n_chunks=n_chunks)
+
+    # Use the first device twice, results have to be identical to using a
+    # single device.
+    settings['gpuid'] = [0, 0]
+    res_multi = OpenCLKraskovCMI(settings).estimate(
+        source, target, source_uncorr, n_chunks=n_chunks)
+    for r1, r2 in zip(res, res_multi):
+        assert np.array_equal(r1, r2), (
+            'Distributing chunks over multiple devices changed results.')
+
+    # Try initialising estimator with unavailable GPU ID
+    device_list, _, _ = OpenCLKraskovCMI()._get_device(gpuid=0)
+    with pytest.raises(RuntimeError):
+        settings['gpuid'] = [0, len(device_list)]
+        OpenCLKraskovCMI(settings=settings)
+
+
+def test_buffer_reuse():
+    """Test repeated estimation with cached device buffers."""
+    expected_mi, source, source_uncorr, target = _get_gauss_data(
+        n=1000, seed=SEED)
+    settings = {'noise_level': 0, 'debug': True, 'return_counts': True}
+    est_mi = OpenCLKraskovMI(settings)
+    est_cmi = OpenCLKraskovCMI(settings)
+    # Alternate between signal lengths and dimensions, such that cached
+    # buffers are both reused and reallocated.
+    for n, n_chunks in [(1000, 2), (200, 1), (1000, 2)]:
+        var1 = np.hstack((source[:n], source_uncorr[:n]))
+        res_mi = est_mi.estimate(var1, target[:n], n_chunks=n_chunks)
+        res_cmi = est_cmi.estimate(
+            source[:n], target[:n], source_uncorr[:n], n_chunks=n_chunks)
+        res_mi_new = OpenCLKraskovMI(settings).estimate(
+            var1, target[:n], n_chunks=n_chunks)
+        res_cmi_new = OpenCLKraskovCMI(settings).estimate(
+            source[:n], target[:n], source_uncorr[:n], n_chunks=n_chunks)
+        for r1, r2 in zip(res_mi + res_cmi, res_mi_new + res_cmi_new):
+            assert np.array_equal(r1, r2), (
+                'Reusing device buffers changed results.')
+
+
+def test_buffer_memory():
+    """Test that cached device buffers stay within the memory budget."""
+    expected_mi, source, source_uncorr, target = _get_gauss_data(
+        n=6000, seed=SEED)
+    max_mem = 80010
+    est_mi = OpenCLKraskovMI({'max_mem': max_mem})
+    est_cmi = OpenCLKraskovCMI({'max_mem': max_mem})
+    # Alternate between calls processed in a single run and calls processed
+    # in multiple runs in flight.
+    chunklength = 500
+    for n_chunks in [5, 12, 5, 12, 3]:
+        n = chunklength * n_chunks
+        est_mi.estimate(source[:n], target[:n], n_chunks=n_chunks)
+        est_cmi.estimate(
+            source[:n], target[:n], source_uncorr[:n], n_chunks=n_chunks)
+        for est in [est_mi, est_cmi]:
+            cached = sum(buffer.size for buffer in est._buffers.values())
+            assert cached <= max_mem, (
+                'Cached device buffers exceed the memory budget.')
+
+    # Shrink the point dimension and grow the chunk length, such that some
+    # cached buffers are larger and others smaller than needed.
+    max_mem = 110000
+    est_mi = OpenCLKraskovMI({'max_mem': max_mem})
+    est_cmi = OpenCLKraskovCMI({'max_mem': max_mem})
+    source_4d = source[:6000].reshape(1500, 4)
+    target_4d = target[:6000].reshape(1500, 4)
+    source_uncorr_4d = source_uncorr[:6000].reshape(1500, 4)
+    est_mi.estimate(source_4d, target_4d, n_chunks=1)
+    est_cmi.estimate(source_4d, target_4d, source_uncorr_4d, n_chunks=1)
+    est_mi.estimate(source[:5000], target[:5000], n_chunks=5)
+    est_cmi.estimate(
+        source[:6000], target[:6000], source_uncorr[:6000], n_chunks=6)
+    for est in [est_mi, est_cmi]:
+        cached = sum(buffer.size for buffer in est._buffers.values())
+        assert cached <= max_mem, (
+            'Cached device buffers exceed the memory budget.')
+
+
+def test_digamma_sums():
+    """Test summation of digammas on device against sums on the host."""
+    expected_mi, source, source_uncorr, target = _get_gauss_data(
+        n=3000, seed=SEED)
+    settings = {'noise_level': 0}
+    settings_debug = {'noise_level': 0, 'debug': True}
+    for n_chunks in [1, 3]:
+        mi = OpenCLKraskovMI(settings).estimate(
+            source, target, n_chunks=n_chunks)
+        mi_host = OpenCLKraskovMI(settings_debug).estimate(
+            source, target, n_chunks=n_chunks)
+        cmi = OpenCLKraskovCMI(settings).estimate(
+            source, target, source_uncorr, n_chunks=n_chunks)
+        cmi_host = OpenCLKraskovCMI(settings_debug).estimate(
+            source, target, source_uncorr, n_chunks=n_chunks)
+        assert np.allclose(mi, mi_host, rtol=0, atol=1e-12), (
+            'MI from digammas summed on device differs from host result.')
+        assert np.allclose(cmi, cmi_host, rtol=0, atol=1e-12), (
+            'CMI from digammas summed on device differs from host result.')
+
+
 if __name__ == '__main__':
+    test_buffer_memory()
+    test_digamma_sums()
+    test_buffer_reuse()
     test_multi_gpu()
+    test_multi_gpu_chunks()
     test_debug_setting()
+    test_rng_seed()
+    test_storage_dtype()
     test_local_values()
-    test_amd_data_padding()
+    test_unaligned_data_sizes()
     test_mi_correlated_gaussians_two_chunks()
     test_cmi_uncorrelated_gaussians_unequal_dims()
     test_cmi_uncorrelated_gaussians_three_dims()
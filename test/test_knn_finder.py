@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from idtxl.knn.knn_finder import KnnFinder
+from idtxl.knn.knn_finder_scipy import ScipyKDTreeKnnFinder
+
+SEED = 42
+
+
+@pytest.mark.parametrize("metric", ["chebyshev", "euclidean"])
+def test_scipy_kdtree_find_neighbors_metric(metric):
+    """Test that the scipy kd-tree finds neighbors using the given metric."""
+    rng = np.random.default_rng(SEED)
+    data = rng.standard_normal((200, 3))
+    k = 4
+
+    finder = ScipyKDTreeKnnFinder(data, metric=metric)
+    dist, _ = finder.find_neighbors(data, k)
+
+    dist_brute = np.sort(cdist(data, data, metric=metric), axis=1)[:, :k]
+    assert np.allclose(dist, dist_brute)
+
+
+@pytest.mark.parametrize("metric", ["chebyshev", "euclidean"])
+def test_scipy_kdtree_find_dist_to_kth_neighbor(metric):
+    """Test the kth neighbor query against the generic implementation."""
+    rng = np.random.default_rng(SEED)
+    data = rng.standard_normal((200, 3))
+
+    finder = ScipyKDTreeKnnFinder(data, metric=metric)
+    for k in [2, 4, 10]:
+        dist = finder.find_dist_to_kth_neighbor(data, k)
+        dist_generic = KnnFinder.find_dist_to_kth_neighbor(finder, data, k)
+        assert dist.shape == (data.shape[0],)
+        assert np.array_equal(dist, dist_generic)
+
+
+if __name__ == "__main__":
+    for metric in ["chebyshev", "euclidean"]:
+        test_scipy_kdtree_find_neighbors_metric(metric)
+        test_scipy_kdtree_find_dist_to_kth_neighbor(metric)
+    print("All tests passed.")